@@ -0,0 +1,83 @@
+# ============================================
+# 🧭 NV Tools — single multipage entry point
+# --------------------------------------------
+# Serves every tool from one Streamlit process instead of six:
+#   streamlit run nv_app.py
+#
+# - Each tool stays a plain script; st.navigation only executes the
+#   selected page, so a tool is loaded on its first visit.
+# - HTTP pool, caches, rate limiters and prompt templates live in
+#   nv_shared / nv_prompts and are created once per server process.
+# - Cold start (process start → first paint) and per-page first render
+#   are measured and shown in the sidebar + server log.
+#
+# Setup:
+#   pip install "streamlit>=1.44" requests
+#   (pages call st.set_page_config themselves, which needs a recent Streamlit)
+#
+# The individual scripts still work standalone with `streamlit run <file>`.
+# Set NV_SERVICE_PORT to also serve the nv_service JSON API from this process.
+# Set NV_SNAPSHOT=<file> to start with warm caches (see nv_snapshot.py).
+# ============================================
+
+import os
+import time
+
+import streamlit as st
+
+import nv_shared
+import nv_snapshot
+
+# Warm caches from $NV_SNAPSHOT once per process (no API quota spent)
+nv_snapshot.load_on_startup()
+
+# Optional: expose the JSON API from this process so it shares the UI's caches
+if os.getenv("NV_SERVICE_PORT"):
+    import nv_service
+    nv_service.start_in_background(os.getenv("NV_SERVICE_HOST", "127.0.0.1"), int(os.getenv("NV_SERVICE_PORT")))
+
+PAGES = {
+    "Prompt Enhancers": [
+        st.Page("nvp1_rctpromptenhancer.py", title="RCT Prompt Enhancer", icon="📝", default=True),
+        st.Page("nvp2_ccscrpromptenhancer.py", title="CC-SC-R Context Enhancer", icon="📝"),
+        st.Page("nvp3_ccscrpromptenhancer.py", title="CCSCR Prompt Enhancer", icon="📝"),
+    ],
+    "Equity Metrics": [
+        st.Page("nvp4_ept.py", title="Equity Metrics (peers)", icon="📈"),
+        st.Page("nvp5_ept.py", title="Equity Metrics (lite)", icon="📈"),
+        st.Page("nvt5_ept.py", title="Equity Metrics (test)", icon="🧪"),
+    ],
+}
+
+page = st.navigation(PAGES)
+
+# Startup report (process-wide, not per session). Drawn before the page runs
+# so a page that ends early with st.stop() does not hide it; a page's own
+# first paint shows up from the next rerun on.
+with st.sidebar.expander("⏱️ Startup & resources"):
+    report = nv_shared.first_paint_report()
+    for title, t in report.items():
+        st.write(f"- **{title}**: {t['since_start']:.2f}s after start · render {t['render'] * 1000:.0f} ms")
+    rss = nv_shared.peak_rss_mb()
+    st.caption(f"Peak RSS: {rss:.0f} MB" if rss is not None else "Peak RSS: n/a")
+    st.caption(
+        f"Cached: {len(nv_shared.search_cache)} searches · "
+        f"{len(nv_shared.overview_cache)} overviews · {len(nv_shared.peers_cache)} peer lists"
+    )
+    if st.button("Prepare cache snapshot"):
+        st.download_button("⬇️ Download snapshot", nv_snapshot.dumps(), file_name="nv_cache.nvsnap",
+                           mime="application/octet-stream")
+
+t0 = time.perf_counter()
+try:
+    page.run()
+finally:
+    # Also counts runs that end early via st.stop()
+    render = time.perf_counter() - t0
+    if nv_shared.record_first_paint(page.title, render):
+        first = nv_shared.first_paint_report()[page.title]
+        print(
+            f"[nv_app] first paint '{page.title}': {first['since_start']:.2f}s after start "
+            f"(render {render:.3f}s), peak RSS {nv_shared.peak_rss_mb() or 0:.0f} MB",
+            flush=True,
+        )
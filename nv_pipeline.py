@@ -0,0 +1,65 @@
+# ============================================
+# 🔁 Rerun-aware pipeline stages (Streamlit)
+# --------------------------------------------
+# Streamlit reruns the whole script on every widget interaction.
+# A "stage" keeps its output in st.session_state together with the inputs
+# it was computed from. On a rerun the stored output is reused as long as
+# the inputs are unchanged, so only stages downstream of the changed
+# widget are recomputed (no repeated network calls / prompt rebuilds).
+#
+# Usage:
+#   from nv_pipeline import stage
+#   search = stage("nvp4.search", (query, apikey), lambda: av_symbol_search(query, apikey))
+#
+# Stage names are global to the session, so prefix them with the app name.
+# ============================================
+
+import streamlit as st
+
+_PREFIX = "_stage::"
+
+
+def stage(name: str, inputs, compute, keep=None):
+    """
+    Return the output of `compute()` for `inputs`, reusing the value stored
+    in session state when the inputs match the previous run of this stage.
+    Exceptions from `compute` propagate and nothing is stored, so a failed
+    call is retried on the next rerun. Likewise, when `keep(value)` is
+    falsy (e.g. a provider's throttle note returned with HTTP 200) the
+    value is returned but not stored.
+    """
+    key = _PREFIX + name
+    cached = st.session_state.get(key)
+    if cached is not None and cached[0] == inputs:
+        return cached[1]
+    value = compute()
+    if keep is None or keep(value):
+        st.session_state[key] = (inputs, value)
+    else:
+        st.session_state.pop(key, None)
+    return value
+
+
+def invalidate(*names: str):
+    """Drop stored outputs (all stages if no names are given)."""
+    if names:
+        keys = [_PREFIX + n for n in names]
+    else:
+        keys = [k for k in st.session_state.keys() if str(k).startswith(_PREFIX)]
+    for k in keys:
+        st.session_state.pop(k, None)
+
+
+def latch(name: str, triggered: bool, value=None):
+    """
+    Keep a button press alive across reruns.
+
+    `st.button` is True only on the run right after the click; any later
+    widget change reruns the script with the button False. `latch` stores
+    `value` when `triggered` and returns the last stored value otherwise
+    (None until the first trigger).
+    """
+    key = "_latch::" + name
+    if triggered:
+        st.session_state[key] = value
+    return st.session_state.get(key)
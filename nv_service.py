@@ -0,0 +1,397 @@
+# ============================================
+# 🛰️ NV headless JSON service (asyncio)
+# --------------------------------------------
+# Programmatic access to the numbers nvp4 computes and the prompts the
+# enhancers build, without scraping the Streamlit UI.
+#
+# Run:
+#   ALPHAVANTAGE_API_KEY=... FINNHUB_API_KEY=... python nv_service.py --port 8765
+#
+# Endpoints (GET with query params for one item, POST a JSON object for one
+# item or a JSON list for a batch — batch answers come back in order):
+#   GET  /health
+#   GET  /resolve?q=Bajaj Finance            → symbol matches (SYMBOL_SEARCH)
+#   GET  /metrics?symbol=IBM                 → PE, P/B, dividend yield, ROE
+#   GET  /sector-pe?symbol=IBM&max_peers=6   → peer sector PE / P/B / yield statistics
+#   POST /enhance/rct | /enhance/cc-sc-r | /enhance/ccscr
+#        body: template fields, e.g. {"role": "...", "draft": "..."}
+#   GET  /snapshot                           → binary cache snapshot (nv_snapshot)
+#   POST /snapshot                           ← import a snapshot into this process; disabled
+#        unless NV_SNAPSHOT_TOKEN is set, and then needs header X-Snapshot-Token
+#
+# Caches and rate limiters are the ones in nv_shared. To share them with the
+# UI, run the service inside the Streamlit process: NV_SERVICE_PORT=8765
+# streamlit run nv_app.py (see start_in_background). Cache hits are answered
+# on the event loop directly; misses run in a bounded worker pool.
+# ============================================
+
+import argparse
+import asyncio
+import hmac
+import inspect
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+import nv_shared
+import nv_snapshot
+import nv_stats
+from nv_prompts import render_cc_sc_r, render_ccscr, render_rct
+
+ALPHAVANTAGE_API_KEY = os.getenv("ALPHAVANTAGE_API_KEY", "")
+FINNHUB_API_KEY = os.getenv("FINNHUB_API_KEY", "")
+# Shared secret for POST /snapshot; empty disables import over HTTP
+SNAPSHOT_TOKEN = os.getenv("NV_SNAPSHOT_TOKEN", "")
+
+MAX_BODY = 1024 * 1024
+MAX_SNAPSHOT_BODY = 128 * 1024 * 1024
+# Applies to every read (request line, each header, body), so a slow client cannot hold a connection
+IDLE_TIMEOUT = 30.0
+MAX_HEADERS = 100
+
+REASONS = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 502: "Bad Gateway"}
+
+
+class BadRequest(ValueError):
+    """Client-side problem with one item (→ 400)."""
+
+
+# ============================================
+# Operations
+# --------------------------------------------
+# Each data operation has a `fast` (cache only, None on miss) and a `slow`
+# (may call providers) variant. Both take one item dict.
+# ============================================
+def _require(item: dict, field: str) -> str:
+    value = str(item.get(field, "")).strip()
+    if not value:
+        raise BadRequest(f"missing '{field}'")
+    return value
+
+
+def _resolve_result(query: str, search: dict) -> dict:
+    matches = []
+    for m in search.get("bestMatches", []):
+        matches.append({
+            "symbol": m.get("1. symbol", ""),
+            "name": m.get("2. name", ""),
+            "region": m.get("4. region", ""),
+            "currency": m.get("8. currency", ""),
+        })
+    return {"query": query, "matches": matches}
+
+
+def resolve_fast(item):
+    q = _require(item, "q")
+    search = nv_shared.av_symbol_search(q, ALPHAVANTAGE_API_KEY, cache_only=True)
+    return None if search is None else _resolve_result(q, search)
+
+
+def resolve_slow(item):
+    q = _require(item, "q")
+    search = nv_shared.av_symbol_search(q, ALPHAVANTAGE_API_KEY)
+    if "bestMatches" not in search:
+        raise RuntimeError(search.get("Note") or search.get("Information") or "symbol search failed")
+    return _resolve_result(q, search)
+
+
+def metrics_fast(item):
+    overview = nv_shared.av_company_overview(_require(item, "symbol"), ALPHAVANTAGE_API_KEY, cache_only=True)
+    return None if overview is None else nv_shared.company_metrics(overview)
+
+
+def metrics_slow(item):
+    symbol = _require(item, "symbol")
+    overview = nv_shared.av_company_overview(symbol, ALPHAVANTAGE_API_KEY)
+    if not overview.get("Symbol"):
+        raise RuntimeError(overview.get("Note") or overview.get("Information") or f"no OVERVIEW for {symbol}")
+    return nv_shared.company_metrics(overview)
+
+
+def _sector_args(item):
+    symbol = _require(item, "symbol")
+    try:
+        max_peers = int(item.get("max_peers", 6))
+    except (TypeError, ValueError):
+        raise BadRequest("'max_peers' must be an integer")
+    return symbol, max(1, min(max_peers, 20))
+
+
+def _sector_result(symbol, result):
+    summary, peer_rows = result
+    return {"symbol": symbol, "sector_pe": summary["pe"]["median"], "stats": summary, "peers": peer_rows}
+
+
+def _sector_key(item):
+    symbol, max_peers = _sector_args(item)
+    return symbol.upper(), max_peers
+
+
+def sector_pe_fast(item):
+    symbol, max_peers = _sector_args(item)
+    result = nv_stats.sector_stats_via_peers(symbol, ALPHAVANTAGE_API_KEY, FINNHUB_API_KEY,
+                                             max_peers=max_peers, cache_only=True)
+    return None if result is None else _sector_result(symbol, result)
+
+
+def sector_pe_slow(item):
+    symbol, max_peers = _sector_args(item)
+    if not FINNHUB_API_KEY:
+        raise BadRequest("sector PE needs FINNHUB_API_KEY on the server")
+    result = nv_stats.sector_stats_via_peers(symbol, ALPHAVANTAGE_API_KEY, FINNHUB_API_KEY, max_peers=max_peers)
+    return _sector_result(symbol, result)
+
+
+def _enhancer(render):
+    params = list(inspect.signature(render).parameters)
+
+    def run(item):
+        unknown = set(item) - set(params)
+        if unknown:
+            raise BadRequest(f"unknown field(s): {', '.join(sorted(unknown))}; expected {', '.join(params)}")
+        if not str(item.get("draft", "")).strip():
+            raise BadRequest("missing 'draft'")
+        return {"prompt": render(**{p: item.get(p, "") for p in params})}
+
+    return run
+
+
+# path → (fast, slow, key). Templates are pure and cheap, so they only have
+# `fast`. `key` maps an item to its upstream cache key, so identical misses
+# (same batch or concurrent clients) share one provider call.
+ROUTES = {
+    "/resolve": (resolve_fast, resolve_slow, lambda item: _require(item, "q").lower()),
+    "/metrics": (metrics_fast, metrics_slow, lambda item: _require(item, "symbol").upper()),
+    "/sector-pe": (sector_pe_fast, sector_pe_slow, _sector_key),
+    "/enhance/rct": (_enhancer(render_rct), None, None),
+    "/enhance/cc-sc-r": (_enhancer(render_cc_sc_r), None, None),
+    "/enhance/ccscr": (_enhancer(render_ccscr), None, None),
+}
+
+
+# ============================================
+# Service
+# ============================================
+class Service:
+    def __init__(self, max_concurrency: int = 8, max_batch: int = 50):
+        self.max_batch = max_batch
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="nv-upstream")
+        self._inflight = {}  # (path, key) → task running the slow call
+
+    async def _slow(self, slow, item):
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, slow, item)
+
+    async def run_item(self, path, item):
+        """Return (status, payload) for one item."""
+        fast, slow, key_of = ROUTES[path]
+        if not isinstance(item, dict):
+            return 400, {"error": "each item must be a JSON object"}
+        try:
+            result = fast(item)
+            if result is None and slow is not None:
+                # Join an identical miss already in flight instead of spending quota again
+                key = (path, key_of(item))
+                task = self._inflight.get(key)
+                if task is None:
+                    task = asyncio.ensure_future(self._slow(slow, item))
+                    self._inflight[key] = task
+                    task.add_done_callback(lambda _t, k=key: self._inflight.pop(k, None))
+                result = await asyncio.shield(task)
+            return 200, result
+        except BadRequest as e:
+            return 400, {"error": str(e)}
+        except Exception as e:
+            return 502, {"error": f"{type(e).__name__}: {e}"}
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        if url.path == "/health":
+            return 200, {
+                "status": "ok",
+                "uptime_s": round(time.time() - nv_shared.STARTED_AT, 1),
+                "cache": {"search": len(nv_shared.search_cache), "overview": len(nv_shared.overview_cache),
+                          "peers": len(nv_shared.peers_cache), "sector": len(nv_shared.sector_cache)},
+            }
+        if url.path == "/snapshot":
+            return await self.snapshot(method, body)
+        if url.path not in ROUTES:
+            return 404, {"error": f"unknown path {url.path}", "paths": ["/health", *ROUTES]}
+
+        if method == "GET":
+            return await self.run_item(url.path, dict(parse_qsl(url.query)))
+        if method != "POST":
+            return 405, {"error": "use GET or POST"}
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError as e:
+            return 400, {"error": f"invalid JSON: {e}"}
+        if not isinstance(payload, list):
+            return await self.run_item(url.path, payload)
+        if len(payload) > self.max_batch:
+            return 400, {"error": f"batch too large ({len(payload)} > {self.max_batch})"}
+        # Answer each distinct item once, then fan the answers back out in order
+        unique = {}
+        for it in payload:
+            unique.setdefault(json.dumps(it, sort_keys=True), it)
+        answers = await asyncio.gather(*(self.run_item(url.path, it) for it in unique.values()))
+        by_item = dict(zip(unique, answers))
+        answers = [by_item[json.dumps(it, sort_keys=True)] for it in payload]
+        return 200, [{"result": p} if s == 200 else {"error": p["error"], "status": s} for s, p in answers]
+
+    async def snapshot(self, method, body):
+        """Export (GET) or import (POST) the shared caches; encoding runs off the event loop."""
+        loop = asyncio.get_running_loop()
+        if method == "GET":
+            return 200, await loop.run_in_executor(None, nv_snapshot.dumps)
+        if method != "POST":
+            return 405, {"error": "use GET or POST"}
+        try:
+            loaded = await loop.run_in_executor(None, nv_snapshot.loads, body)
+        except nv_snapshot.SnapshotError as e:
+            return 400, {"error": str(e)}
+        return 200, {"loaded": loaded}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                except ValueError:
+                    # Longer than the stream limit (64 KiB)
+                    await self.respond(writer, 400, {"error": "request line too long"}, time.perf_counter(), False)
+                    break
+                if not line.strip():
+                    break
+                started = time.perf_counter()
+                try:
+                    method, target, version = line.decode("latin-1").split()
+                except ValueError:
+                    await self.respond(writer, 400, {"error": "malformed request line"}, started, False)
+                    break
+
+                headers = {}
+                try:
+                    # One extra read for the blank line that ends MAX_HEADERS headers
+                    for _ in range(MAX_HEADERS + 1):
+                        h = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                        if h in (b"\r\n", b"\n", b""):
+                            break
+                        name, _, value = h.decode("latin-1").partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                    else:
+                        await self.respond(writer, 400, {"error": f"more than {MAX_HEADERS} headers"}, started, False)
+                        break
+                except ValueError:
+                    await self.respond(writer, 400, {"error": "header line too long"}, started, False)
+                    break
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    # Body framing is unknown, so the connection cannot be reused
+                    await self.respond(writer, 400, {"error": "invalid Content-Length"}, started, False)
+                    break
+                limit = MAX_BODY
+                if urlsplit(target).path == "/snapshot" and method.upper() == "POST":
+                    # Checked before reading the body: unauthorized clients never upload
+                    if not SNAPSHOT_TOKEN:
+                        await self.respond(writer, 403, {"error": "snapshot import is disabled "
+                                                         "(start the service with NV_SNAPSHOT_TOKEN)"}, started, False)
+                        break
+                    if not hmac.compare_digest(headers.get("x-snapshot-token", "").encode(), SNAPSHOT_TOKEN.encode()):
+                        await self.respond(writer, 403, {"error": "bad or missing X-Snapshot-Token"}, started, False)
+                        break
+                    limit = MAX_SNAPSHOT_BODY
+                if length > limit:
+                    await self.respond(writer, 413, {"error": "body too large"}, started, False)
+                    break
+                body = await asyncio.wait_for(reader.readexactly(length), IDLE_TIMEOUT) if length else b""
+
+                status, payload = await self.dispatch(method.upper(), target, body)
+                await self.respond(writer, status, payload, started, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            # Client went away or stalled mid-request: just drop the connection
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, payload, started, keep_alive):
+        if isinstance(payload, bytes):
+            data, content_type = payload, "application/octet-stream"
+        else:
+            data, content_type = json.dumps(payload).encode(), "application/json"
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        head = (
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            f"X-Response-Time-ms: {elapsed_ms:.2f}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + data)
+        await writer.drain()
+
+
+async def serve(host: str, port: int, max_concurrency: int, max_batch: int):
+    service = Service(max_concurrency=max_concurrency, max_batch=max_batch)
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"[nv_service] listening on http://{host}:{port} "
+          f"(concurrency {max_concurrency}, batch ≤ {max_batch})", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+_background = None
+_background_lock = threading.Lock()
+
+
+def start_in_background(host: str = "127.0.0.1", port: int = 8765, max_concurrency: int = 8, max_batch: int = 50):
+    """
+    Serve from a daemon thread inside the current process (e.g. the Streamlit
+    server), so API clients and UI sessions share one set of caches/limiters.
+    Safe to call on every rerun; only the first call starts the server.
+    """
+    global _background
+    with _background_lock:
+        if _background is None:
+            _background = threading.Thread(
+                target=asyncio.run, args=(serve(host, port, max_concurrency, max_batch),),
+                name="nv-service", daemon=True,
+            )
+            _background.start()
+    return _background
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless JSON service for NV metrics and prompt enhancers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-concurrency", type=int, default=8,
+                        help="upstream calls in flight at once (cache hits are not limited)")
+    parser.add_argument("--max-batch", type=int, default=50, help="max items per batch request")
+    parser.add_argument("--snapshot", default=os.getenv("NV_SNAPSHOT"),
+                        help="warm the caches from this nv_snapshot file before serving")
+    args = parser.parse_args()
+    nv_snapshot.load_on_startup(args.snapshot)
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_concurrency, args.max_batch))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
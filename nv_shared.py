@@ -0,0 +1,298 @@
+# ============================================
+# 🧰 Shared process-wide resources
+# --------------------------------------------
+# One instance of each per server process, shared by every page/session:
+# - HTTP session with a pooled connection adapter
+# - Rate limiters (Alpha Vantage free tier ~5 req/min, Finnhub ~60 req/min)
+# - TTL caches for symbol search, company OVERVIEW, peer lists and sector PE
+# - Small helpers that every app used to copy (safe_float, metric parsing)
+# - Cold-start / first-paint timings for the multipage entry point
+#
+# Nothing here imports Streamlit, so non-UI callers can reuse the same
+# caches and limiters.
+# ============================================
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+AV_URL = "https://www.alphavantage.co/query"
+FINNHUB_PEERS_URL = "https://finnhub.io/api/v1/stock/peers"
+
+# Fundamentals refresh at most daily on the provider side
+CACHE_TTL = float(os.getenv("NV_CACHE_TTL", 24 * 3600))
+# Room for a ~2,000-symbol watchlist plus up to 6 peers each
+CACHE_SIZE = int(os.getenv("NV_CACHE_SIZE", 16384))
+
+
+def safe_float(x):
+    try:
+        return float(x) if x not in (None, "None", "", "NA", "nan") else None
+    except Exception:
+        return None
+
+
+# ============================================
+# HTTP session (connection pool)
+# ============================================
+_session = None
+_session_lock = threading.Lock()
+
+
+def http_session() -> requests.Session:
+    """Lazily create the process-wide pooled session."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                _session = s
+    return _session
+
+
+# ============================================
+# Rate limiting
+# ============================================
+class RateLimiter:
+    """
+    Sliding-window limiter: at most `calls` acquisitions per `period` seconds,
+    across all threads. acquire() blocks until a slot frees up.
+    """
+
+    def __init__(self, calls: int, period: float):
+        self.calls = calls
+        self.period = period
+        self._stamps = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._stamps = [t for t in self._stamps if now - t < self.period]
+                if len(self._stamps) < self.calls:
+                    self._stamps.append(now)
+                    return
+                wait = self.period - (now - self._stamps[0])
+            time.sleep(wait)
+
+
+av_limiter = RateLimiter(int(os.getenv("NV_AV_CALLS_PER_MIN", 5)), 60.0)
+finnhub_limiter = RateLimiter(int(os.getenv("NV_FINNHUB_CALLS_PER_MIN", 60)), 60.0)
+
+
+# ============================================
+# TTL caches
+# ============================================
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire `ttl` seconds after storing."""
+
+    def __init__(self, ttl: float = CACHE_TTL, maxsize: int = CACHE_SIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if time.time() - item[0] > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return item[1]
+
+    def set(self, key, value, stored_at=None):
+        with self._lock:
+            self._data[key] = (time.time() if stored_at is None else stored_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+    def dump(self):
+        """Unexpired entries as [(key, stored_at, value), ...] (for snapshots)."""
+        now = time.time()
+        with self._lock:
+            return [(k, t, v) for k, (t, v) in self._data.items() if now - t <= self.ttl]
+
+    def load(self, entries):
+        """
+        Bulk-insert (key, stored_at, value) entries under one lock, keeping
+        their original timestamps. Expired entries and entries older than
+        what is already cached are skipped. Returns the number loaded.
+        """
+        now = time.time()
+        loaded = 0
+        with self._lock:
+            for key, stored_at, value in sorted(entries, key=lambda e: e[1]):
+                if now - stored_at > self.ttl:
+                    continue
+                current = self._data.get(key)
+                if current is not None and current[0] >= stored_at:
+                    continue
+                self._data[key] = (stored_at, value)
+                self._data.move_to_end(key)
+                loaded += 1
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return loaded
+
+
+search_cache = TTLCache()
+overview_cache = TTLCache()
+peers_cache = TTLCache()
+sector_cache = TTLCache()  # filled by nv_stats.sector_stats_via_peers
+
+# name → cache, as exported/imported by nv_snapshot
+CACHES = {
+    "search": search_cache,
+    "overview": overview_cache,
+    "peers": peers_cache,
+    "sector": sector_cache,
+}
+
+
+# ============================================
+# Provider calls (cached + rate limited)
+# ============================================
+def _get_json(url: str, params: dict, limiter: RateLimiter):
+    limiter.acquire()
+    r = http_session().get(url, params=params, timeout=20)
+    r.raise_for_status()
+    return r.json() if r.text else None
+
+
+def av_symbol_search(keywords: str, apikey: str, cache_only: bool = False):
+    """
+    Use Alpha Vantage SYMBOL_SEARCH to find best-matching tickers.
+    With cache_only=True a miss returns None instead of calling the API.
+    """
+    key = keywords.strip().lower()
+    cached = search_cache.get(key)
+    if cached is not None or cache_only:
+        return cached
+    data = _get_json(AV_URL, {"function": "SYMBOL_SEARCH", "keywords": keywords, "apikey": apikey}, av_limiter)
+    # AV answers throttling/errors with HTTP 200 + a "Note"/"Information" body; don't cache those
+    if isinstance(data, dict) and "bestMatches" in data:
+        search_cache.set(key, data)
+    return data or {}
+
+
+def av_company_overview(symbol: str, apikey: str, cache_only: bool = False):
+    """Use Alpha Vantage OVERVIEW to fetch fundamental ratios."""
+    key = symbol.upper()
+    cached = overview_cache.get(key)
+    if cached is not None or cache_only:
+        return cached
+    data = _get_json(AV_URL, {"function": "OVERVIEW", "symbol": symbol, "apikey": apikey}, av_limiter)
+    if isinstance(data, dict) and data.get("Symbol"):
+        overview_cache.set(key, data)
+    return data or {}
+
+
+def finnhub_company_peers(symbol: str, apikey: str, cache_only: bool = False):
+    """Get peer tickers from Finnhub (if key provided)."""
+    key = symbol.upper()
+    cached = peers_cache.get(key)
+    if cached is not None or cache_only:
+        return cached
+    data = _get_json(FINNHUB_PEERS_URL, {"symbol": symbol, "token": apikey}, finnhub_limiter)
+    if isinstance(data, list):
+        peers_cache.set(key, data)
+        return data
+    return []
+
+
+# ============================================
+# Derived metrics
+# ============================================
+def company_metrics(overview: dict) -> dict:
+    """Parse the ratios the apps display from an OVERVIEW payload (None = NA)."""
+    return {
+        "symbol": overview.get("Symbol"),
+        "name": overview.get("Name"),
+        "pe": safe_float(overview.get("PERatio")),
+        "pb": safe_float(overview.get("PriceToBookRatio")),
+        "dividend_yield": safe_float(overview.get("DividendYield")),
+        "roe_ttm": safe_float(overview.get("ReturnOnEquityTTM")),
+    }
+
+
+# ============================================
+# Cold start / first paint
+# ============================================
+def _process_start_time():
+    """
+    Wall-clock time this process was started. Streamlit boots and imports
+    the entry script well after exec, so module import time would hide
+    that part of the cold start. Sources, most precise first:
+    NV_STARTED_AT (epoch seconds, set by a launcher), /proc (Linux),
+    psutil, and finally this module's import time.
+    """
+    env = os.getenv("NV_STARTED_AT")
+    if env:
+        try:
+            return float(env)
+        except ValueError:
+            pass
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 is starttime (clock ticks after boot); comm (field 2) may contain spaces
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - (uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().create_time()
+    except Exception:
+        return time.time()
+
+
+STARTED_AT = _process_start_time()
+
+_first_paint = {}
+_first_paint_lock = threading.Lock()
+
+
+def record_first_paint(page: str, render_seconds: float):
+    """Remember the first render of `page` in this process; later calls are ignored."""
+    with _first_paint_lock:
+        if page not in _first_paint:
+            _first_paint[page] = {
+                "since_start": time.time() - STARTED_AT,
+                "render": render_seconds,
+            }
+            return True
+    return False
+
+
+def first_paint_report():
+    with _first_paint_lock:
+        return dict(_first_paint)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
@@ -0,0 +1,291 @@
+# ============================================
+# 📦 Cache snapshots (export / import / verify)
+# --------------------------------------------
+# A fresh instance starts cold and must rebuild every OVERVIEW through
+# ~5 req/min calls (a 2,000-symbol watchlist takes hours). A snapshot
+# carries the warm caches from nv_shared — symbol search results, OVERVIEW
+# payloads, peer lists and sector statistics, each with the timestamp it
+# was fetched at — so a new replica serves warm results right away and
+# spends no API quota.
+#
+# File layout (version 1):
+#   header  = MAGIC (6s) | version (H) | entry count (Q) | payload length (Q) | sha256 of payload (32s)
+#   payload = zlib-compressed JSON {"created_at": ..., "caches": {name: [[key, stored_at, value], ...]}}
+# Imports mmap the file, check magic/version/length/sha256 on the mapped
+# bytes, check every entry's key/value types, then bulk-load each cache under
+# a single lock. Entries keep their original timestamps, so NV_CACHE_TTL
+# still decides what is fresh (timestamps in the future are rejected).
+#
+# Commands:
+#   python nv_snapshot.py export warm.nvsnap --from http://127.0.0.1:8765
+#   NV_SNAPSHOT_TOKEN=... python nv_snapshot.py import warm.nvsnap --to http://127.0.0.1:8765
+#   python nv_snapshot.py verify warm.nvsnap
+# and at startup: NV_SNAPSHOT=warm.nvsnap streamlit run nv_app.py   (or any nvp4/nvp5 page)
+#                 python nv_service.py --snapshot warm.nvsnap
+# Importing over HTTP replaces what UI users are served, so nv_service only
+# accepts it when started with NV_SNAPSHOT_TOKEN and the request carries it.
+# ============================================
+
+import argparse
+import contextlib
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import urllib.request
+import zlib
+
+import nv_shared
+
+MAGIC = b"NVSNAP"
+VERSION = 1
+HEADER = struct.Struct(">6sHQQ32s")
+# Cap on the decompressed payload, so a small zip bomb cannot exhaust memory
+MAX_RAW = int(os.getenv("NV_SNAPSHOT_MAX_RAW", 256 * 1024 * 1024))
+# Allowed clock skew between the exporting and importing machines
+MAX_SKEW = 300
+# nv_stats.METRICS keys, repeated here so checking a snapshot does not need numpy
+SECTOR_METRICS = {"pe", "pb", "dividend_yield"}
+
+
+class SnapshotError(ValueError):
+    """The file is not a usable snapshot (wrong magic/version, truncated, corrupt)."""
+
+
+# ============================================
+# JSON mapping of cache keys / values
+# --------------------------------------------
+# search / overview / peers use string keys; their values are the provider
+# payload (dict) or the peer ticker list. The sector cache uses
+# (symbol, max_peers) keys and (summary, peer_rows) values, with band tuples
+# inside the summary; those come back from JSON as lists. Anything else is
+# rejected here, so pages never see a value of the wrong type from a cache.
+# ============================================
+def _decode_entry(name, key, value):
+    if name == "sector":
+        if not (isinstance(key, list) and len(key) == 2 and isinstance(key[0], str)
+                and isinstance(key[1], int) and not isinstance(key[1], bool)):
+            raise SnapshotError("key must be [symbol, max_peers]")
+        if not (isinstance(value, list) and len(value) == 2):
+            raise SnapshotError("value must be [summary, peer_rows]")
+        summary, peer_rows = value
+        if not (isinstance(summary, dict) and set(summary) == SECTOR_METRICS
+                and all(isinstance(stats, dict) for stats in summary.values())):
+            raise SnapshotError(f"summary must map {sorted(SECTOR_METRICS)} to estimator objects")
+        if not (isinstance(peer_rows, list) and all(isinstance(row, dict) for row in peer_rows)):
+            raise SnapshotError("peer_rows must be a list of objects")
+        for stats in summary.values():
+            for field, v in stats.items():
+                if field.endswith("_band") and v is not None:
+                    if not (isinstance(v, list) and len(v) == 2):
+                        raise SnapshotError(f"'{field}' must be [low, high]")
+                    stats[field] = tuple(v)
+        return tuple(key), (summary, peer_rows)
+    if not isinstance(key, str):
+        raise SnapshotError("key must be a string")
+    if name == "peers":
+        if not (isinstance(value, list) and all(isinstance(p, str) for p in value)):
+            raise SnapshotError("value must be a list of tickers")
+    elif not isinstance(value, dict):
+        raise SnapshotError("value must be an object")
+    return key, value
+
+
+# ============================================
+# Encode / decode
+# ============================================
+def dumps(level: int = 9) -> bytes:
+    """Serialize the current nv_shared caches into snapshot bytes."""
+    caches = {name: cache.dump() for name, cache in nv_shared.CACHES.items()}
+    count = sum(len(entries) for entries in caches.values())
+    doc = {"created_at": time.time(), "caches": caches}
+    payload = zlib.compress(json.dumps(doc, separators=(",", ":")).encode(), level)
+    header = HEADER.pack(MAGIC, VERSION, count, len(payload), hashlib.sha256(payload).digest())
+    return header + payload
+
+
+def parse(buf) -> dict:
+    """Check and decode snapshot bytes (bytes, memoryview or mmap)."""
+    # Views are released on exit so a caller's mmap can be closed afterwards
+    with memoryview(buf) as view:
+        if len(view) < HEADER.size:
+            raise SnapshotError("file too short for a snapshot header")
+        magic, version, count, length, digest = HEADER.unpack(view[:HEADER.size])
+        if magic != MAGIC:
+            raise SnapshotError("not an NV snapshot (bad magic)")
+        if version != VERSION:
+            raise SnapshotError(f"unsupported snapshot version {version} (expected {VERSION})")
+        with view[HEADER.size:] as payload:
+            if len(payload) != length:
+                raise SnapshotError(f"truncated snapshot: payload {len(payload)} bytes, header says {length}")
+            if hashlib.sha256(payload).digest() != digest:
+                raise SnapshotError("checksum mismatch (corrupt snapshot)")
+            try:
+                inflater = zlib.decompressobj()
+                raw = inflater.decompress(payload, MAX_RAW)
+                if inflater.unconsumed_tail:
+                    raise SnapshotError(f"payload inflates past {MAX_RAW:,} bytes (NV_SNAPSHOT_MAX_RAW)")
+                if not inflater.eof:
+                    raise SnapshotError("undecodable payload: incomplete zlib stream")
+            except zlib.error as e:
+                raise SnapshotError(f"undecodable payload: {e}")
+    try:
+        doc = json.loads(raw)
+    except ValueError as e:
+        raise SnapshotError(f"undecodable payload: {e}")
+    _check_structure(doc)
+    found = sum(len(entries) for entries in doc["caches"].values())
+    if found != count:
+        raise SnapshotError(f"entry count mismatch: {found} in payload, header says {count}")
+    return doc
+
+
+def _check_structure(doc):
+    """A checksum only proves the bytes are intact; make sure they have the expected shape."""
+    if not isinstance(doc, dict) or not isinstance(doc.get("caches"), dict):
+        raise SnapshotError("malformed snapshot: expected an object with a 'caches' object")
+    if not isinstance(doc.get("created_at"), (int, float)):
+        raise SnapshotError("malformed snapshot: 'created_at' must be a number")
+    for name, entries in doc["caches"].items():
+        if not isinstance(entries, list):
+            raise SnapshotError(f"malformed snapshot: cache '{name}' must be a list")
+        for entry in entries:
+            if not isinstance(entry, list) or len(entry) != 3:
+                raise SnapshotError(f"malformed snapshot: '{name}' entries must be [key, stored_at, value]")
+            if isinstance(entry[1], bool) or not isinstance(entry[1], (int, float)):
+                raise SnapshotError(f"malformed snapshot: '{name}' stored_at must be a number")
+
+
+def decode(doc) -> dict:
+    """Checked cache entries of a parsed snapshot: name → [(key, stored_at, value), ...]."""
+    latest = time.time() + MAX_SKEW
+    decoded = {}
+    for name, entries in doc["caches"].items():
+        if name not in nv_shared.CACHES:
+            continue  # written by a newer build; ignore unknown caches
+        rows = []
+        for key, stored_at, value in entries:
+            if stored_at > latest:
+                # Would otherwise stay "fresh" past NV_CACHE_TTL
+                raise SnapshotError(f"malformed snapshot: '{name}' entry stored in the future")
+            try:
+                key, value = _decode_entry(name, key, value)
+            except SnapshotError as e:
+                raise SnapshotError(f"malformed snapshot: bad '{name}' entry: {e}")
+            rows.append((key, stored_at, value))
+        decoded[name] = rows
+    return decoded
+
+
+def loads(buf) -> dict:
+    """Import snapshot bytes into the nv_shared caches. Returns name → entries loaded."""
+    # Decode everything first so a bad entry leaves the caches untouched
+    decoded = decode(parse(buf))
+    return {name: nv_shared.CACHES[name].load(rows) for name, rows in decoded.items()}
+
+
+def write_file(path: str, data: bytes):
+    """Write snapshot bytes atomically (no half-written file on failure)."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+@contextlib.contextmanager
+def _mapped(path: str):
+    """Read-only mmap of `path`."""
+    with open(path, "rb") as f:
+        # mmap refuses empty files with a bare ValueError
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            raise SnapshotError("file too short for a snapshot header")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+
+def import_file(path: str) -> dict:
+    """mmap `path` and bulk-load it into the caches."""
+    with _mapped(path) as mm:
+        return loads(mm)
+
+
+_startup_done = False
+_startup_lock = threading.Lock()
+
+
+def load_on_startup(path: str = None):
+    """
+    Import `path` (default: $NV_SNAPSHOT) once per process. Safe to call on
+    every Streamlit rerun. Problems are reported, never raised, so a bad
+    snapshot only means a cold start.
+    """
+    global _startup_done
+    path = path or os.getenv("NV_SNAPSHOT")
+    with _startup_lock:
+        if _startup_done or not path:
+            return None
+        _startup_done = True
+    started = time.perf_counter()
+    try:
+        loaded = import_file(path)
+    except (OSError, SnapshotError) as e:
+        print(f"[nv_snapshot] could not load {path}: {e}", flush=True)
+        return None
+    print(f"[nv_snapshot] loaded {path} in {time.perf_counter() - started:.2f}s: {loaded}", flush=True)
+    return loaded
+
+
+# ============================================
+# CLI
+# ============================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export, import or verify NV cache snapshots")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_export = sub.add_parser("export", help="download a snapshot from a running nv_service")
+    p_export.add_argument("path")
+    p_export.add_argument("--from", dest="url", default="http://127.0.0.1:8765")
+    p_import = sub.add_parser("import", help="push a snapshot into a running nv_service")
+    p_import.add_argument("path")
+    p_import.add_argument("--to", dest="url", default="http://127.0.0.1:8765")
+    p_import.add_argument("--token", default=os.getenv("NV_SNAPSHOT_TOKEN", ""),
+                          help="must match the service's NV_SNAPSHOT_TOKEN (default: $NV_SNAPSHOT_TOKEN)")
+    p_verify = sub.add_parser("verify", help="check integrity and print entry counts")
+    p_verify.add_argument("path")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "export":
+            with urllib.request.urlopen(args.url.rstrip("/") + "/snapshot", timeout=60) as r:
+                data = r.read()
+            parse(data)  # refuse to write a broken file
+            write_file(args.path, data)
+            print(f"wrote {args.path} ({len(data):,} bytes)")
+        elif args.command == "import":
+            with open(args.path, "rb") as f:
+                data = f.read()
+            parse(data)  # fail locally before sending
+            req = urllib.request.Request(
+                args.url.rstrip("/") + "/snapshot", data=data, method="POST",
+                headers={"Content-Type": "application/octet-stream", "X-Snapshot-Token": args.token},
+            )
+            with urllib.request.urlopen(req, timeout=60) as r:
+                print(r.read().decode())
+        else:
+            with _mapped(args.path) as mm:
+                doc = parse(mm)
+            decode(doc)
+            created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(doc["created_at"]))
+            counts = {name: len(entries) for name, entries in doc["caches"].items()}
+            print(f"ok: version {VERSION}, created {created}, entries {counts}")
+    except (SnapshotError, OSError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
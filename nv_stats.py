@@ -0,0 +1,222 @@
+# ============================================
+# 📐 Sector valuation statistics (vectorized)
+# --------------------------------------------
+# A plain mean of peer PEs is easily dominated by one outlier (PE 300 among
+# six peers). SectorStats summarizes each metric with robust estimators:
+#   - median (+ distribution-free 95% band from order statistics)
+#   - trimmed mean (+ 95% band from the winsorized variance)
+#   - harmonic mean (+ 95% band via the mean of reciprocals); for dividend
+#     yield it is taken over paying peers only (yield > 0), since one
+#     zero-yield peer would otherwise make it undefined. That subset is
+#     reported as n_harmonic, next to n for the other estimators
+#   - market-cap-weighted aggregate, using MarketCapitalization from the
+#     same OVERVIEW payload (no extra calls)
+# for PE, P/B and dividend yield.
+#
+# Rows can be added in chunks (add / add_overviews); running sums are kept
+# as rows arrive and the order-statistics are done in one numpy pass in
+# summary(), so thousands of constituents are cheap.
+#
+# numpy ships with Streamlit; the headless service needs `pip install numpy`.
+# ============================================
+
+import numpy as np
+
+import nv_shared
+from nv_shared import safe_float
+
+Z95 = 1.959964
+
+# metric → (OVERVIEW field, how to cap-weight it)
+#   "harmonic":   Σcap / Σ(cap / x)   (aggregate price / aggregate earnings or book)
+#   "arithmetic": Σ(cap · x) / Σcap   (yield of the combined portfolio)
+METRICS = {
+    "pe": ("PERatio", "harmonic"),
+    "pb": ("PriceToBookRatio", "harmonic"),
+    "dividend_yield": ("DividendYield", "arithmetic"),
+}
+
+
+def _valid(metric: str, x: np.ndarray) -> np.ndarray:
+    """Mask of usable values: ratios must be positive, yields non-negative."""
+    finite = np.isfinite(x)
+    with np.errstate(invalid="ignore"):
+        return finite & (x >= 0) if metric == "dividend_yield" else finite & (x > 0)
+
+
+def _median_band(s: np.ndarray):
+    """95% band for the median from binomial order statistics (s sorted)."""
+    n = s.size
+    half = Z95 * np.sqrt(n) / 2
+    lo = int(np.clip(np.floor(n / 2 - half), 0, n - 1))
+    hi = int(np.clip(np.ceil(n / 2 + half), 0, n - 1))
+    return float(s[lo]), float(s[hi])
+
+
+def _trimmed(s: np.ndarray, trim: float):
+    """Trimmed mean of sorted `s` and a 95% band (Tukey–McLaughlin), floored at 0."""
+    n = s.size
+    g = int(np.floor(trim * n))
+    if g == 0 and trim > 0 and n >= 4:
+        # Small peer sets (≈6): still drop the single most extreme value per side
+        g = 1
+    core = s[g:n - g]
+    tmean = float(core.mean())
+    if n < 3 or core.size < 2:
+        return tmean, None
+    wins = np.clip(s, core[0], core[-1])
+    se = wins.std(ddof=1) / ((1 - 2 * g / n) * np.sqrt(n))
+    # All metrics are non-negative, so a normal-approximation tail below 0 is meaningless
+    return tmean, (float(max(tmean - Z95 * se, 0.0)), float(tmean + Z95 * se))
+
+
+def _harmonic(x: np.ndarray):
+    """
+    Harmonic mean and a 95% band (delta on the mean of reciprocals).
+    A side of the band that is unbounded (mean reciprocal within noise of 0)
+    is None rather than inf, which is not valid JSON.
+    """
+    if x.size == 0 or np.any(x <= 0):
+        return None, None
+    r = 1.0 / x
+    m = r.mean()
+    if x.size < 2:
+        return float(1 / m), None
+    se = r.std(ddof=1) / np.sqrt(x.size)
+    lo_r, hi_r = m + Z95 * se, m - Z95 * se
+    band = (float(1 / lo_r), float(1 / hi_r) if hi_r > 0 else None)
+    return float(1 / m), band
+
+
+class SectorStats:
+    """Streaming accumulator for peer valuation rows."""
+
+    def __init__(self, trim: float = 0.1):
+        self.trim = trim
+        self._values = {m: [] for m in METRICS}
+        # Running sums for the cap-weighted aggregates: metric → [num, den, n]
+        self._weighted = {m: [0.0, 0.0, 0] for m in METRICS}
+
+    def add(self, market_caps, **values):
+        """
+        Add a chunk of rows. `market_caps` and each metric in `values`
+        (pe=..., pb=..., dividend_yield=...) are equal-length array-likes;
+        missing entries are NaN/None. Metrics not given count as missing.
+        """
+        caps = np.asarray(market_caps, dtype=float)
+        for metric, (_, weighting) in METRICS.items():
+            x = np.asarray(values.get(metric, np.full(caps.shape, np.nan)), dtype=float)
+            if x.shape != caps.shape:
+                raise ValueError(f"'{metric}' has {x.size} rows, market_caps has {caps.size}")
+            self._values[metric].append(x)
+
+            ok = _valid(metric, x)
+            with np.errstate(invalid="ignore"):
+                ok &= np.isfinite(caps) & (caps > 0)
+            if weighting == "harmonic":
+                ok &= x > 0
+            c, v = caps[ok], x[ok]
+            acc = self._weighted[metric]
+            if weighting == "harmonic":
+                acc[0] += c.sum()
+                acc[1] += (c / v).sum()
+            else:
+                acc[0] += (c * v).sum()
+                acc[1] += c.sum()
+            acc[2] += int(ok.sum())
+        return self
+
+    def add_overviews(self, overviews):
+        """Add Alpha Vantage OVERVIEW payloads (dicts) as one chunk."""
+        overviews = list(overviews)
+        caps = [safe_float(ov.get("MarketCapitalization")) for ov in overviews]
+        values = {
+            metric: [safe_float(ov.get(field)) for ov in overviews]
+            for metric, (field, _) in METRICS.items()
+        }
+        # None becomes NaN in add() (dtype=float)
+        return self.add(caps, **values)
+
+    def summary(self) -> dict:
+        """metric → dict of estimators (None where not enough data)."""
+        out = {}
+        for metric in METRICS:
+            chunks = self._values[metric]
+            x = np.concatenate(chunks) if chunks else np.empty(0)
+            x = x[_valid(metric, x)]
+            num, den, n_weighted = self._weighted[metric]
+            stats = {
+                "n": int(x.size),
+                "mean": None,
+                "median": None,
+                "median_band": None,
+                "trimmed_mean": None,
+                "trimmed_band": None,
+                "harmonic_mean": None,
+                "harmonic_band": None,
+                "n_harmonic": 0,
+                "cap_weighted": float(num / den) if den > 0 else None,
+                "n_weighted": n_weighted,
+            }
+            if x.size:
+                s = np.sort(x)
+                stats["mean"] = float(s.mean())
+                stats["median"] = float(np.median(s))
+                if s.size >= 2:
+                    stats["median_band"] = _median_band(s)
+                stats["trimmed_mean"], stats["trimmed_band"] = _trimmed(s, self.trim)
+                # Zero yields are valid data but have no reciprocal; use paying peers only
+                paying = s[s > 0]
+                stats["n_harmonic"] = int(paying.size)
+                stats["harmonic_mean"], stats["harmonic_band"] = _harmonic(paying)
+            out[metric] = stats
+        return out
+
+
+# ============================================
+# Peer-based sector valuation
+# ============================================
+def sector_stats_via_peers(symbol: str, av_key: str, finnhub_key: str, max_peers: int = 6,
+                           cache_only: bool = False):
+    """
+    Sector valuation from up to `max_peers` Finnhub peers, each priced via
+    AV OVERVIEW. Returns (summary, peer_rows): summary is SectorStats.summary(),
+    peer_rows is [{"symbol", "pe", "pb", "dividend_yield", "market_cap"}, ...].
+    """
+    key = (symbol.upper(), max_peers)
+    cached = nv_shared.sector_cache.get(key)
+    if cached is not None or cache_only:
+        return cached
+    peers = nv_shared.finnhub_company_peers(symbol, finnhub_key)
+    # Limit number of peers to be gentle with AV rate limits (e.g., first 6)
+    peers = [p for p in peers if isinstance(p, str) and p.upper() != symbol.upper()][:max_peers]
+    overviews = []
+    failed = 0
+    for p in peers:
+        try:
+            # Shared AV limiter paces calls (~5/min); cached peers cost nothing
+            ov = nv_shared.av_company_overview(p, av_key)
+        except Exception:
+            failed += 1
+            continue
+        if not ov.get("Symbol"):
+            # Throttle note / unknown ticker: not a real "no data" answer
+            failed += 1
+            continue
+        overviews.append(ov)
+
+    peer_rows = [
+        {
+            "symbol": ov.get("Symbol"),
+            "pe": safe_float(ov.get("PERatio")),
+            "pb": safe_float(ov.get("PriceToBookRatio")),
+            "dividend_yield": safe_float(ov.get("DividendYield")),
+            "market_cap": safe_float(ov.get("MarketCapitalization")),
+        }
+        for ov in overviews
+    ]
+    result = (SectorStats().add_overviews(overviews).summary(), peer_rows)
+    # Only cache complete runs; a partial result is retried next time
+    if not failed:
+        nv_shared.sector_cache.set(key, result)
+    return result
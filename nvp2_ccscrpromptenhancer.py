@@ -1,5 +1,8 @@
 import streamlit as st
 
+from nv_pipeline import latch, stage
+from nv_prompts import render_cc_sc_r
+
 st.set_page_config(page_title="Context Enhancer (CC-SC-R)", page_icon="📝")
 st.title("📝 Context Engineer — CC-SC-R Prompt Enhancer by NV")
 st.caption("Demo Mode — Learn how to structure better prompts with CC-SC-R")
@@ -63,56 +66,22 @@ draft = st.text_area("Your draft prompt:", height=160)
 # ──────────────────────────────────────────────────────────────────────────────
 # Enhance (Demo Mode)
 # ──────────────────────────────────────────────────────────────────────────────
-if st.button("Enhance Prompt (Demo Mode)"):
+# Keep showing the prompt after other widget changes (st.button is True for one run only)
+if latch("nvp2.enhance", st.button("Enhance Prompt (Demo Mode)"), True):
     if not draft.strip():
         st.warning("Please enter a draft prompt.")
     else:
-        # Instruction block describing how to use CC-SC-R to transform the draft
-        instruction = (
-            "Generate an enhanced, structured prompt using the CC-SC-R framework.\n"
-            "Follow these rules strictly:\n"
-            "1) Use the provided Context Requirements to ground the prompt.\n"
-            "2) Respect all Constraint Specifications (policies, tone, environment).\n"
-            "3) Enforce the Structure Mandates (sections + formatting).\n"
-            "4) Include Checkpoint Integration: summarize assumptions, risks, confidence.\n"
-            "5) Add Review Protocols: note human approval and edit expectations.\n"
-            "6) Ask EXACTLY ONE clarifying question.\n"
-            "7) Output format: 3 concise bullets (≤12 words each) under 'Reformulated Prompt'."
-        )
-
-        # Demo payload showing what the model would see in a real run
-        payload = (
-            f"ROLE: {role}\n\n"
-            "CC-SC-R INPUTS\n"
-            "— Context Requirements —\n"
-            f"Domain: {ctx_domain}\n"
-            f"Audience: {ctx_audience}\n"
-            f"Goals: {ctx_goals}\n"
-            f"Data Sources: {ctx_data_sources}\n\n"
-            "— Constraint Specifications —\n"
-            f"Policies/Compliance: {cons_policies}\n"
-            f"Tone: {cons_tone}\n"
-            f"Environment: {cons_env}\n\n"
-            "— Structure Mandates —\n"
-            f"Required Sections:\n{struct_sections}\n\n"
-            f"Formatting/Organization:\n{struct_formatting}\n\n"
-            "— Checkpoint Integration —\n"
-            f"Assumptions:\n{cp_assumptions}\n\n"
-            f"Risks:\n{cp_risks}\n\n"
-            f"Confidence: {cp_confidence}%\n\n"
-            "— Review Protocols —\n"
-            f"Human Approval / Edits:\n{rev_human}\n\n"
-            f"Accountability:\n{rev_accountability}\n\n"
-            "USER DRAFT:\n"
-            f"{draft}\n\n"
-            "OUTPUT SPEC:\n"
-            "- 'Reformulated Prompt' section: 3 bullets, ≤12 words each\n"
-            "- 'One Clarifying Question' section: exactly one question\n"
-            "- 'Assumptions & Risks' section: brief bullets"
+        # Rebuilt only when one of the inputs changed since the last run
+        inputs = (
+            role, ctx_domain, ctx_audience, ctx_goals, ctx_data_sources,
+            cons_policies, cons_tone, cons_env, struct_sections, struct_formatting,
+            cp_assumptions, cp_risks, cp_confidence, rev_human, rev_accountability,
+            draft,
         )
+        prompt = stage("nvp2.prompt", inputs, lambda: render_cc_sc_r(*inputs))
 
         st.success("Enhanced Prompt (Demo Mode)")
-        st.code(instruction + "\n\n" + payload, language="markdown")
+        st.code(prompt, language="markdown")
 
         st.info("💡 This is demo mode showing the CC-SC-R structure. In live mode, AI would generate the actual enhanced prompt content.")
 
@@ -1,5 +1,8 @@
 import streamlit as st
 
+from nv_pipeline import latch, stage
+from nv_prompts import render_ccscr
+
 # -------------------------------
 # Page setup
 # -------------------------------
@@ -55,29 +58,17 @@ draft = st.text_area("Your draft prompt:", height=140)
 # -------------------------------
 # Enhancement Button Logic
 # -------------------------------
-if st.button("Enhance Prompt"):
+# Keep showing the prompt after other widget changes (st.button is True for one run only)
+if latch("nvp3.enhance", st.button("Enhance Prompt"), True):
     if not draft.strip():
         st.warning("Please enter a draft prompt.")
     else:
-        # Demo output showing CCSCR structure
-        instruction = (
-            "Generate an enhanced, structured prompt using CCSCR.\n"
-            "1) Improve clarity and completeness\n"
-            "2) Ask ONE clarifying question\n"
-            "3) Specify output format (3 bullets, ≤12 words each)\n"
-        )
-        
-        demo_output = (
-            f"CONTEXT REQUIREMENTS:\n{context_req}\n\n"
-            f"CONSTRAINT SPECIFICATIONS:\n{constraint_spec}\n\n"
-            f"STRUCTURE MANDATES:\n{structure_mandates}\n\n"
-            f"CHECKPOINT INTEGRATION:\n{checkpoint_integration}\n\n"
-            f"REVIEW PROTOCOLS:\n{review_protocols}\n\n"
-            f"USER DRAFT:\n{draft}\n\n"
-            "OUTPUT FORMAT:\n- 3 concise bullets\n- 1 clarifying question"
-        )
+        # Rebuilt only when one of the inputs changed since the last run
+        inputs = (context_req, constraint_spec, structure_mandates,
+                  checkpoint_integration, review_protocols, draft)
+        prompt = stage("nvp3.prompt", inputs, lambda: render_ccscr(*inputs))
         
         st.success("Enhanced Prompt (Demo Mode)")
-        st.code(instruction + "\n" + demo_output, language="markdown")
+        st.code(prompt, language="markdown")
         
         st.info("💡 This is demo mode showing the CCSCR structure. In live mode, AI would generate the actual enhanced prompt!")
@@ -5,14 +5,17 @@
 # - Input: Company name (e.g., "Bajaj Finance")
 # - Output: PE, Sector PE (approx*), P/B, Dividend Yield, ROE
 # - Provider: Alpha Vantage (Company OVERVIEW)
-# - Optional Sector PE approx: Finnhub peers + Alpha Vantage PERatio avg
+# - Optional Sector PE approx: Finnhub peers + Alpha Vantage PERatio (nv_stats)
 #
-# *Sector PE "approx" is computed as the average PE of peers (if enabled).
-#   It is a proxy and may differ from official “Industry/Sector PE” on portals.
+# *Sector PE "approx" is the median PE of peers (if enabled); mean, trimmed
+#   mean, harmonic mean and market-cap-weighted PE (plus P/B and dividend
+#   yield) are shown alongside. It is a proxy and may differ from official
+#   “Industry/Sector PE” on portals.
 #
 # Setup:
 #   pip install streamlit requests
 #   streamlit run app.py
+#   (optional warm start: NV_SNAPSHOT=warm.nvsnap streamlit run nvp4_ept.py)
 #
 # NOTE: You need API keys:
 #   - Alpha Vantage (free): https://www.alphavantage.co/support/#api-key
@@ -21,10 +24,16 @@
 # ============================================
 
 import os
-import time
-import requests
 import streamlit as st
 
+from nv_pipeline import invalidate, latch, stage
+from nv_shared import av_company_overview, av_symbol_search, company_metrics
+import nv_snapshot
+from nv_stats import sector_stats_via_peers
+
+# Warm caches from $NV_SNAPSHOT when run standalone (no-op after the first call per process)
+nv_snapshot.load_on_startup()
+
 # --------------------------------------------
 # Page setup
 # --------------------------------------------
@@ -54,7 +63,7 @@ context_requirements = st.text_area(
 st.subheader("2️⃣ Constraint Specifications")
 default_constraints = (
     "Use Alpha Vantage for ratios (OVERVIEW).\n"
-    "Optionally use Finnhub to get peers and average their PE as sector proxy.\n"
+    "Optionally use Finnhub to get peers and use their median PE as sector proxy.\n"
     "Respect API rate limits (AV free ~5 req/min). Handle missing/NA fields safely.\n"
     "No PII. Data is for information only; not investment advice."
 )
@@ -96,7 +105,7 @@ structure_mandates = st.text_area(
 st.subheader("4️⃣ Checkpoint Integration")
 default_checkpoint = (
     "Assumptions: Alpha Vantage OVERVIEW exposes PERatio, PriceToBookRatio, DividendYield, ReturnOnEquityTTM. "
-    "Sector PE is approximated as mean peer PE.\n"
+    "Sector PE is approximated as median peer PE (robust to single outliers).\n"
     "Risks: Symbol resolution ambiguity; API rate limits; data freshness; missing fields.\n"
     "Mitigation: Use SYMBOL_SEARCH; show top matches to pick; return NA on missing; throttle requests.\n"
     "QA: Echo raw symbol used; display provider and timestamp."
@@ -131,30 +140,6 @@ go = st.button("Fetch Metrics")
 # Helper functions
 # ============================================
 
-def av_symbol_search(keywords: str, apikey: str):
-    """Use Alpha Vantage SYMBOL_SEARCH to find best-matching tickers."""
-    url = "https://www.alphavantage.co/query"
-    params = {"function": "SYMBOL_SEARCH", "keywords": keywords, "apikey": apikey}
-    r = requests.get(url, params=params, timeout=20)
-    r.raise_for_status()
-    return r.json()
-
-def av_company_overview(symbol: str, apikey: str):
-    """Use Alpha Vantage OVERVIEW to fetch fundamental ratios."""
-    url = "https://www.alphavantage.co/query"
-    params = {"function": "OVERVIEW", "symbol": symbol, "apikey": apikey}
-    r = requests.get(url, params=params, timeout=20)
-    r.raise_for_status()
-    return r.json()
-
-def finnhub_company_peers(symbol: str, apikey: str):
-    """Get peer tickers from Finnhub (if key provided)."""
-    url = "https://finnhub.io/api/v1/stock/peers"
-    params = {"symbol": symbol, "token": apikey}
-    r = requests.get(url, params=params, timeout=20)
-    r.raise_for_status()
-    return r.json() if r.text else []
-
 def infer_exchange_suffix(name_hint: str, raw_symbol: str) -> str:
     """
     Try to help with Indian symbols that typically require .NS / .BSE on some providers.
@@ -168,23 +153,41 @@ def infer_exchange_suffix(name_hint: str, raw_symbol: str) -> str:
     # For US/Other or Auto, keep as-is
     return raw_symbol
 
-def safe_float(x):
-    try:
-        return float(x) if x not in (None, "None", "", "NA", "nan") else None
-    except Exception:
-        return None
+def fmt_value(v, pct=False):
+    if v is None:
+        return "NA"
+    return f"{v:.2%}" if pct else f"{v:.2f}"
+
+def fmt_band(b, pct=False):
+    """Render a (low, high) confidence band; NA when too few peers."""
+    if not b:
+        return "NA"
+    high = fmt_value(b[1], pct) if b[1] is not None else "unbounded"
+    return f"{fmt_value(b[0], pct)} – {high}"
 
 # ============================================
 # Main action
 # ============================================
+# Latch the query on click: later reruns (e.g. changing the symbol pick)
+# keep going with the stored query instead of dropping all fetched data.
+# An explicit click always refetches (retry after throttling / partial peers).
 if go:
+    invalidate("nvp4.search", "nvp4.overview", "nvp4.peers")
+active_query = latch("nvp4.query", go, company_query)
+
+if active_query:
     if not ALPHAVANTAGE_API_KEY:
         st.error("Please provide an Alpha Vantage API key in the sidebar.")
         st.stop()
 
     # ---- Step 1: Symbol search and user confirmation ----
     try:
-        search = av_symbol_search(company_query, ALPHAVANTAGE_API_KEY)
+        search = stage(
+            "nvp4.search",
+            (active_query, ALPHAVANTAGE_API_KEY),
+            lambda: av_symbol_search(active_query, ALPHAVANTAGE_API_KEY),
+            keep=lambda data: "bestMatches" in data,
+        )
     except Exception as e:
         st.error(f"Search error: {e}")
         st.stop()
@@ -212,38 +215,37 @@ if go:
 
     # ---- Step 2: Fetch core metrics via OVERVIEW ----
     try:
-        overview = av_company_overview(selected_symbol, ALPHAVANTAGE_API_KEY)
+        overview = stage(
+            "nvp4.overview",
+            (selected_symbol, ALPHAVANTAGE_API_KEY),
+            lambda: av_company_overview(selected_symbol, ALPHAVANTAGE_API_KEY),
+            keep=lambda data: bool(data.get("Symbol")),
+        )
     except Exception as e:
         st.error(f"Overview fetch error: {e}")
         st.stop()
 
     # Parse key fields (Alpha Vantage field names)
-    pe = safe_float(overview.get("PERatio"))
-    pb = safe_float(overview.get("PriceToBookRatio"))
-    div_yield = safe_float(overview.get("DividendYield"))
-    roe_ttm = safe_float(overview.get("ReturnOnEquityTTM"))
+    metrics = company_metrics(overview)
+    pe = metrics["pe"]
+    pb = metrics["pb"]
+    div_yield = metrics["dividend_yield"]
+    roe_ttm = metrics["roe_ttm"]
 
     # ---- Step 3: Optional Sector PE (approx via peers) ----
-    sector_pe = None
-    peer_debug = []
+    sector = None
+    peer_rows = []
     if compute_sector_pe and FINNHUB_API_KEY:
         try:
-            peers = finnhub_company_peers(selected_symbol, FINNHUB_API_KEY)
-            # Limit number of peers to be gentle with AV rate limits (e.g., first 6)
-            peers = [p for p in peers if isinstance(p, str) and p.upper() != selected_symbol.upper()][:6]
-            peer_pes = []
-            for p in peers:
-                try:
-                    time.sleep(12)  # AV free tier ~5 calls/min; be conservative
-                    ov = av_company_overview(p, ALPHAVANTAGE_API_KEY)
-                    ppe = safe_float(ov.get("PERatio"))
-                    if ppe and ppe > 0:
-                        peer_pes.append(ppe)
-                        peer_debug.append((p, ppe))
-                except Exception as _:
-                    continue
-            if peer_pes:
-                sector_pe = sum(peer_pes) / len(peer_pes)
+            sector, peer_rows = stage(
+                "nvp4.peers",
+                (selected_symbol, ALPHAVANTAGE_API_KEY, FINNHUB_API_KEY),
+                lambda: sector_stats_via_peers(selected_symbol, ALPHAVANTAGE_API_KEY, FINNHUB_API_KEY),
+                # Only complete runs land in the shared sector cache; partial ones are retried
+                keep=lambda _: sector_stats_via_peers(
+                    selected_symbol, ALPHAVANTAGE_API_KEY, FINNHUB_API_KEY, cache_only=True
+                ) is not None,
+            )
         except Exception as e:
             st.warning(f"Peer-based Sector PE failed: {e}")
 
@@ -258,16 +260,34 @@ if go:
         st.metric("Dividend Yield", f"{div_yield:.2%}" if div_yield is not None else "NA")
         st.metric("ROE (TTM)", f"{roe_ttm:.2%}" if roe_ttm is not None else "NA")
 
-    st.metric("Sector PE (approx via peers)", f"{sector_pe:.2f}" if sector_pe is not None else "NA")
+    sector_pe = sector["pe"]["median"] if sector else None
+    st.metric("Sector PE (median of peers)", f"{sector_pe:.2f}" if sector_pe is not None else "NA")
+
+    if sector:
+        with st.expander("📐 Sector valuation (peer statistics)"):
+            for key, label, pct in [("pe", "P/E", False), ("pb", "P/B", False), ("dividend_yield", "Dividend Yield", True)]:
+                s = sector[key]
+                st.write(f"**{label}** (n={s['n']}, cap-weighted n={s['n_weighted']})")
+                # Zero yields have no reciprocal, so the harmonic mean can cover fewer peers
+                n_harmonic = s.get("n_harmonic", s["n"])
+                harmonic_label = "Harmonic mean" if n_harmonic == s["n"] else f"Harmonic mean (n={n_harmonic} paying)"
+                st.write(
+                    f"- Median: {fmt_value(s['median'], pct)} (95%: {fmt_band(s['median_band'], pct)})\n"
+                    f"- Trimmed mean: {fmt_value(s['trimmed_mean'], pct)} (95%: {fmt_band(s['trimmed_band'], pct)})\n"
+                    f"- {harmonic_label}: {fmt_value(s['harmonic_mean'], pct)} (95%: {fmt_band(s['harmonic_band'], pct)})\n"
+                    f"- Market-cap weighted: {fmt_value(s['cap_weighted'], pct)}\n"
+                    f"- Plain mean: {fmt_value(s['mean'], pct)}"
+                )
 
     # ---- Step 5: Trace / Debug for auditability ----
     with st.expander("🔎 Debug / Trace (for audit)"):
         st.write("**Alpha Vantage OVERVIEW raw keys available:**")
         st.code(", ".join(sorted(list(overview.keys()))))
-        if peer_debug:
-            st.write("**Peer PEs used for Sector PE approx:**")
-            for p, val in peer_debug:
-                st.write(f"- {p}: {val:.2f}")
+        if peer_rows:
+            st.write("**Peer values used for Sector PE approx:**")
+            for row in peer_rows:
+                cap_txt = f"{row['market_cap']:,.0f}" if row["market_cap"] is not None else "NA"
+                st.write(f"- {row['symbol']}: PE {fmt_value(row['pe'])} | MarketCap {cap_txt}")
         st.caption("Timestamp: fetched at runtime | All values depend on provider refresh cycles.")
 
     st.success("Done. Please cross-verify numbers with filings if using for decisions.")
@@ -1,7 +1,13 @@
 import os
-import requests
 import streamlit as st
 
+from nv_pipeline import invalidate, latch, stage
+from nv_shared import av_company_overview
+import nv_snapshot
+
+# Warm caches from $NV_SNAPSHOT when run standalone (no-op after the first call per process)
+nv_snapshot.load_on_startup()
+
 # --------------------------------------------
 # Page setup
 # --------------------------------------------
@@ -71,16 +77,10 @@ go = st.button("Fetch Metrics")
 # ============================================
 # Helper functions
 # ============================================
-def safe_float(x):
-    try:
-        return float(x) if x not in (None, "None", "", "NA", "nan") else None
-    except Exception:
-        return None
-
-def dummy_data():
+def dummy_data(company: str):
     """Fallback if API not available"""
     return {
-        "Company": company_query,
+        "Company": company,
         "PE": "NA",
         "Sector PE": "NA",
         "P/B": "NA",
@@ -91,15 +91,11 @@ def dummy_data():
 def fetch_data(symbol: str):
     """Fetch from Alpha Vantage (Overview). Fallback → dummy."""
     if not ALPHAVANTAGE_API_KEY:
-        return dummy_data()
+        return dummy_data(symbol)
     try:
-        url = "https://www.alphavantage.co/query"
-        params = {"function": "OVERVIEW", "symbol": symbol, "apikey": ALPHAVANTAGE_API_KEY}
-        r = requests.get(url, params=params, timeout=20)
-        r.raise_for_status()
-        data = r.json()
+        data = av_company_overview(symbol, ALPHAVANTAGE_API_KEY)
         return {
-            "Company": data.get("Name", company_query),
+            "Company": data.get("Name", symbol),
             "PE": data.get("PERatio", "NA"),
             "Sector PE": "NA",  # left as NA unless computed separately
             "P/B": data.get("PriceToBookRatio", "NA"),
@@ -107,13 +103,22 @@ def fetch_data(symbol: str):
             "ROE": data.get("ReturnOnEquityTTM", "NA")
         }
     except Exception:
-        return dummy_data()
+        return dummy_data(symbol)
 
 # ============================================
 # Main Logic
 # ============================================
+# Keep the last fetched query alive across reruns; refetch only when it changes.
+# fetch_data falls back to NA instead of raising, so an explicit click refetches.
 if go:
-    result = fetch_data(company_query)
+    invalidate("nvt5.result")
+active_query = latch("nvt5.query", go, company_query)
+if active_query:
+    result = stage(
+        "nvt5.result",
+        (active_query, ALPHAVANTAGE_API_KEY),
+        lambda: fetch_data(active_query),
+    )
 
     # ---- Display ----
     st.subheader("📊 Result")